@@ -12,6 +12,7 @@ All frames are padded to a uniform output cell size (max_w x max_h),
 centered horizontally, bottom-aligned (feet at bottom).
 """
 
+import numpy as np
 from PIL import Image
 import os
 
@@ -32,10 +33,10 @@ def composite_bird(name, files, du_frame_w, du_frame_h, lr_frame_w, lr_frame_h,
     Down/Up use du_frame_w x du_frame_h, Left/Right use lr_frame_w x lr_frame_h.
     Output uses uniform cell size = max(widths) x max(heights), padded with transparency.
     """
-    down = Image.open(os.path.join(ME_BASE, files[0]))
-    up = Image.open(os.path.join(ME_BASE, files[1]))
-    left = Image.open(os.path.join(ME_BASE, files[2]))
-    right = Image.open(os.path.join(ME_BASE, files[3]))
+    down = Image.open(os.path.join(ME_BASE, files[0])).convert("RGBA")
+    up = Image.open(os.path.join(ME_BASE, files[1])).convert("RGBA")
+    left = Image.open(os.path.join(ME_BASE, files[2])).convert("RGBA")
+    right = Image.open(os.path.join(ME_BASE, files[3])).convert("RGBA")
 
     du_frames = min(down.width // du_frame_w, up.width // du_frame_w)
     lr_frames = min(left.width // lr_frame_w, right.width // lr_frame_w)
@@ -52,25 +53,26 @@ def composite_bird(name, files, du_frame_w, du_frame_h, lr_frame_w, lr_frame_h,
 
     out_w = n_frames * cell_w
     out_h = 4 * cell_h
-    result = Image.new("RGBA", (out_w, out_h), (0, 0, 0, 0))
+    result = np.zeros((out_h, out_w, 4), dtype=np.uint8)
 
     strips = [
-        (down, du_frame_w, du_frame_h),
-        (up, du_frame_w, du_frame_h),
-        (left, lr_frame_w, lr_frame_h),
-        (right, lr_frame_w, lr_frame_h),
+        (np.asarray(down), du_frame_w, du_frame_h),
+        (np.asarray(up), du_frame_w, du_frame_h),
+        (np.asarray(left), lr_frame_w, lr_frame_h),
+        (np.asarray(right), lr_frame_w, lr_frame_h),
     ]
 
-    for row, (img, fw, fh) in enumerate(strips):
+    for row, (src, fw, fh) in enumerate(strips):
         # Padding: center horizontally, bottom-align vertically
         pad_x = (cell_w - fw) // 2
         pad_y = cell_h - fh
+        y = row * cell_h + pad_y
         for i in range(n_frames):
-            frame = img.crop((i * fw, 0, (i + 1) * fw, fh))
-            result.paste(frame, (i * cell_w + pad_x, row * cell_h + pad_y))
+            x = i * cell_w + pad_x
+            result[y:y + fh, x:x + fw] = src[:fh, i * fw:(i + 1) * fw]
 
     out_path = os.path.join(OUT_DIR, out_name)
-    result.save(out_path)
+    Image.fromarray(result).save(out_path, optimize=True)
     print(f"  {out_name}: {out_w}x{out_h} ({n_frames} frames, {cell_w}x{cell_h} cells)")
 
 
@@ -81,21 +83,20 @@ def composite_uniform(name, pattern, frame_w, frame_h, out_name):
     frame_counts = []
     for d in dirs:
         path = os.path.join(ME_BASE, pattern.format(dir=d))
-        img = Image.open(path)
+        img = Image.open(path).convert("RGBA")
         frames = img.width // frame_w
         frame_counts.append(frames)
-        strips.append(img)
+        strips.append(np.asarray(img))
 
     n_frames = min(frame_counts)
     out_w = n_frames * frame_w
     out_h = 4 * frame_h
-    result = Image.new("RGBA", (out_w, out_h), (0, 0, 0, 0))
-    for row, img in enumerate(strips):
-        cropped = img.crop((0, 0, out_w, frame_h))
-        result.paste(cropped, (0, row * frame_h))
+    result = np.zeros((out_h, out_w, 4), dtype=np.uint8)
+    for row, src in enumerate(strips):
+        result[row * frame_h:(row + 1) * frame_h] = src[:frame_h, :out_w]
 
     out_path = os.path.join(OUT_DIR, out_name)
-    result.save(out_path)
+    Image.fromarray(result).save(out_path, optimize=True)
     print(f"  {out_name}: {out_w}x{out_h} ({n_frames} frames, {frame_w}x{frame_h})")
 
 
@@ -14,6 +14,11 @@ import os
 import sys
 from PIL import Image
 
+try:
+    import numpy as np
+except ImportError:  # --verify falls back to scanning the flat alpha buffer
+    np = None
+
 SRC = os.path.join(os.path.dirname(__file__), "..", "public/assets/sprites/player.png")
 DST = SRC  # overwrite in place
 
@@ -25,6 +30,37 @@ CROP_X = 16
 CROP_Y = 16
 
 
+def in_crop(lx, ly):
+    return CROP_X <= lx < CROP_X + NEW_CELL and CROP_Y <= ly < CROP_Y + NEW_CELL
+
+
+def outside_pixels(src, cols, rows):
+    """Yield (row, col, lx, ly) for every visible pixel outside the crop region.
+
+    Alpha is viewed as (rows, cols, OLD_CELL, OLD_CELL) and the per-cell crop
+    mask broadcasts over every cell at once.
+    """
+    alpha = np.asarray(src)[:rows * OLD_CELL, :cols * OLD_CELL, 3]
+    opaque = alpha.reshape(rows, OLD_CELL, cols, OLD_CELL).transpose(0, 2, 1, 3) > 0
+    crop = np.zeros((OLD_CELL, OLD_CELL), dtype=bool)
+    crop[CROP_Y:CROP_Y + NEW_CELL, CROP_X:CROP_X + NEW_CELL] = True
+    for row, col, ly, lx in np.argwhere(opaque & ~crop):
+        yield int(row), int(col), int(lx), int(ly)
+
+
+def outside_pixels_flat(src, cols, rows):
+    """Same as outside_pixels without NumPy: one pass over the flat alpha bytes."""
+    alpha = src.getchannel("A").tobytes()
+    stride = src.width
+    for row in range(rows):
+        for col in range(cols):
+            for ly in range(OLD_CELL):
+                base = (row * OLD_CELL + ly) * stride + col * OLD_CELL
+                for lx in range(OLD_CELL):
+                    if alpha[base + lx] and not in_crop(lx, ly):
+                        yield row, col, lx, ly
+
+
 def main():
     verify_only = "--verify" in sys.argv
 
@@ -36,20 +72,12 @@ def main():
 
     if verify_only:
         # Just verify the crop region contains all content
-        pixels = src.load()
+        scan = outside_pixels if np is not None else outside_pixels_flat
         ok = True
-        for row in range(rows):
-            for col in range(cols):
-                for ly in range(OLD_CELL):
-                    for lx in range(OLD_CELL):
-                        a = pixels[col * OLD_CELL + lx, row * OLD_CELL + ly][3]
-                        if a > 0:
-                            in_crop = (CROP_X <= lx < CROP_X + NEW_CELL and
-                                       CROP_Y <= ly < CROP_Y + NEW_CELL)
-                            if not in_crop:
-                                print(f"  WARNING: [{row},{col}] pixel at ({lx},{ly}) "
-                                      f"is outside crop region!")
-                                ok = False
+        for row, col, lx, ly in scan(src, cols, rows):
+            print(f"  WARNING: [{row},{col}] pixel at ({lx},{ly}) "
+                  f"is outside crop region!")
+            ok = False
         if ok:
             print("All non-transparent pixels are inside the crop region.")
         return
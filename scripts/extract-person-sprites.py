@@ -13,6 +13,7 @@ Sheet layout (16x16 cells, characters are 16x32 = 2 rows per frame):
 Output row order matches Direction enum: Down=0, Up=1, Left=2, Right=3
 """
 
+import numpy as np
 from PIL import Image
 import os
 
@@ -41,20 +42,20 @@ COUNT = 20
 
 for i in range(1, COUNT + 1):
     path = os.path.join(SRC_DIR, f"Premade_Character_{i:02d}.png")
-    src = Image.open(path).convert("RGBA")
+    src = np.asarray(Image.open(path).convert("RGBA"))
 
-    out = Image.new("RGBA", (FRAMES_PER_DIR * FRAME_W, 4 * FRAME_H), (0, 0, 0, 0))
+    out = np.zeros((4 * FRAME_H, FRAMES_PER_DIR * FRAME_W, 4), dtype=np.uint8)
 
+    # A direction's frames sit side by side in the source, so each output
+    # row is a single block copy
     for target_row, src_group in DIR_MAP.items():
-        for frame in range(FRAMES_PER_DIR):
-            sx = (src_group * FRAMES_PER_DIR + frame) * FRAME_W
-            cell = src.crop((sx, WALK_ROW_Y, sx + FRAME_W, WALK_ROW_Y + FRAME_H))
-            dx = frame * FRAME_W
-            dy = target_row * FRAME_H
-            out.paste(cell, (dx, dy))
+        sx = src_group * FRAMES_PER_DIR * FRAME_W
+        dy = target_row * FRAME_H
+        out[dy:dy + FRAME_H] = src[WALK_ROW_Y:WALK_ROW_Y + FRAME_H, sx:sx + FRAMES_PER_DIR * FRAME_W]
 
+    out_img = Image.fromarray(out)
     out_path = os.path.join(DST_DIR, f"person{i}.png")
-    out.save(out_path)
-    print(f"Saved {out_path} ({out.width}x{out.height})")
+    out_img.save(out_path)
+    print(f"Saved {out_path} ({out_img.width}x{out_img.height})")
 
 print(f"\nDone! Extracted {COUNT} character walk sprites.")
@@ -13,10 +13,24 @@ from __future__ import annotations
 
 import hashlib
 import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
+
+import numpy as np
 from PIL import Image
 
 TILE = 16
+# Anchors verified per single, rarest hash first. Any indexed anchor of a
+# grid-aligned match already lists the true location, so more rarely help.
+MAX_ANCHORS = 2
+# Threads reading singles for the dedup pass (file reads and blake2b release the GIL)
+IO_THREADS = 8
+# hash_tiles: one fixed odd key per uint64 word of a tile (seeded, so every
+# worker derives the same keys), tiles per vectorized batch, fmix64 multiplier
+HASH_KEYS = np.random.default_rng(0x7113F0).integers(1, 2**63, TILE * TILE * 4 // 8, dtype=np.uint64) | np.uint64(1)
+HASH_BATCH = 4096
+FMIX_PRIME = np.uint64(0xFF51AFD7ED558CCD)
 REPO = Path(__file__).resolve().parent.parent
 ME_DIR = REPO / "assets" / "exteriors" / "Modern_Exteriors_16x16"
 MASTER = ME_DIR / "Modern_Exteriors_Complete_Tileset.png"
@@ -24,65 +38,86 @@ SINGLES_DIR = ME_DIR / "Modern_Exteriors_Complete_Singles_16x16"
 OUT = REPO / "public" / "data" / "me-atlas-index.json"
 
 
-def normalize_tile(img: Image.Image, x: int, y: int) -> bytes:
-    """Extract a 16x16 tile with RGB zeroed where alpha=0 for consistent comparison."""
-    tile = img.crop((x, y, x + TILE, y + TILE))
-    pixels = list(tile.getdata())
-    normalized = []
-    for r, g, b, a in pixels:
-        if a == 0:
-            normalized.extend((0, 0, 0, 0))
-        else:
-            normalized.extend((r, g, b, a))
-    return bytes(normalized)
-
+def as_rgba(img: Image.Image) -> Image.Image:
+    """Convert to RGBA only when needed; convert() always copies, even RGBA->RGBA."""
+    return img if img.mode == "RGBA" else img.convert("RGBA")
 
-def hash_tile(img: Image.Image, x: int, y: int) -> str:
-    """Hash a 16x16 tile region (RGB normalized where alpha=0)."""
-    return hashlib.md5(normalize_tile(img, x, y)).hexdigest()
 
+def normalize_tiles(tiles: np.ndarray) -> np.ndarray:
+    """Zero RGB where alpha=0, in place, for consistent comparison."""
+    tiles[tiles[..., 3] == 0] = 0
+    return tiles
 
-def is_empty_tile(img: Image.Image, x: int, y: int) -> bool:
-    """Check if a 16x16 tile region is fully transparent."""
-    region = img.crop((x, y, x + TILE, y + TILE))
-    alpha = region.split()[3]
-    return alpha.getextrema() == (0, 0)
 
+def hash_tiles(tiles: np.ndarray) -> np.ndarray:
+    """Hash a stack of normalized (N, 16, 16, 4) tiles to N 64-bit ints at once.
 
-def pixels_match(single: Image.Image, master: Image.Image, mx: int, my: int) -> bool:
+    Multiply-shift over each tile's 128 little-endian uint64 words with fixed
+    random odd keys, summed mod 2**64 and finished with the murmur3 fmix64
+    mixer. Collisions only cost an extra verification, never a wrong match.
+    """
+    words = np.ascontiguousarray(tiles).reshape(len(tiles), TILE * TILE * 4).view("<u8")
+    out = np.empty(len(tiles), dtype=np.uint64)
+    for start in range(0, len(tiles), HASH_BATCH):
+        x = words[start:start + HASH_BATCH] * HASH_KEYS
+        x ^= x >> np.uint64(32)
+        h = x.sum(axis=1, dtype=np.uint64)
+        h ^= h >> np.uint64(33)
+        h *= FMIX_PRIME
+        h ^= h >> np.uint64(33)
+        out[start:start + HASH_BATCH] = h
+    return out
+
+
+def is_empty_tile(alpha: np.ndarray, x: int, y: int) -> bool:
+    """Check if a 16x16 tile region of a precomputed alpha plane is fully transparent."""
+    return not alpha[y:y + TILE, x:x + TILE].any()
+
+
+def pixels_match(
+    single: np.ndarray, master: np.ndarray, mx: int, my: int, opaque: bool = False
+) -> bool:
     """Pixel-perfect verification: compare entire single against master region.
 
     Ignores RGB differences where alpha=0 (visually identical transparent pixels
-    may have different RGB values between singles and atlas).
+    may have different RGB values between singles and atlas). A fully opaque
+    single has no such pixels, so it is compared as a whole.
     """
-    sw, sh = single.size
-    mw, mh = master.size
+    sh, sw = single.shape[:2]
+    mh, mw = master.shape[:2]
     if mx + sw > mw or my + sh > mh:
         return False
-    s_data = single.getdata()
-    m_data = master.crop((mx, my, mx + sw, my + sh)).getdata()
-    for (sr, sg, sb, sa), (mr, mg, mb, ma) in zip(s_data, m_data):
-        if sa != ma:
-            return False
-        if sa > 0 and (sr != mr or sg != mg or sb != mb):
-            return False
-    return True
+    region = master[my:my + sh, mx:mx + sw]
+    if opaque:
+        return np.array_equal(single, region)
+    if not np.array_equal(single[..., 3], region[..., 3]):
+        return False
+    visible = single[..., 3] > 0
+    return np.array_equal(single[visible][:, :3], region[visible][:, :3])
+
 
+def alpha_integral(img: np.ndarray) -> np.ndarray:
+    """Summed-area table of the alpha plane: sat[y, x] = alpha[:y, :x].sum()."""
+    h, w = img.shape[:2]
+    sat = np.zeros((h + 1, w + 1), dtype=np.int64)
+    sat[1:, 1:] = img[..., 3].cumsum(axis=0, dtype=np.int64).cumsum(axis=1)
+    return sat
 
-def build_master_index(master: Image.Image) -> dict[str, list[tuple[int, int]]]:
+
+def build_master_index(master: np.ndarray) -> dict[int, list[tuple[int, int]]]:
     """Hash every non-empty 16x16 cell. Returns hash -> [(x,y), ...]"""
-    w, h = master.size
+    h, w = master.shape[:2]
     cols, rows = w // TILE, h // TILE
-    index: dict[str, list[tuple[int, int]]] = {}
-    empty = 0
-    for row in range(rows):
-        for col in range(cols):
-            px, py = col * TILE, row * TILE
-            if is_empty_tile(master, px, py):
-                empty += 1
-                continue
-            h_val = hash_tile(master, px, py)
-            index.setdefault(h_val, []).append((px, py))
+    # Every cell as its own contiguous (TILE, TILE, 4) block, normalized and
+    # hashed in one vectorized pass; Python only fills the dict
+    pixels = master[:rows * TILE, :cols * TILE]
+    tiles = normalize_tiles(pixels.reshape(rows, TILE, cols, TILE, 4).transpose(0, 2, 1, 3, 4).copy())
+    non_empty = tiles[..., 3].any(axis=(2, 3))
+    index: dict[int, list[tuple[int, int]]] = {}
+    hashes = hash_tiles(tiles[non_empty])
+    for (row, col), h_val in zip(np.argwhere(non_empty).tolist(), hashes.tolist()):
+        index.setdefault(h_val, []).append((col * TILE, row * TILE))
+    empty = int(non_empty.size - np.count_nonzero(non_empty))
     total = cols * rows
     print(f"Master: {cols}x{rows} = {total} cells, {total - empty} non-empty, {empty} empty")
     print(f"Unique tile hashes: {len(index)}")
@@ -90,58 +125,154 @@ def build_master_index(master: Image.Image) -> dict[str, list[tuple[int, int]]]:
 
 
 def find_single_in_master(
-    single: Image.Image,
-    master_index: dict[str, list[tuple[int, int]]],
-    master: Image.Image,
+    single: np.ndarray,
+    master_index: dict[int, list[tuple[int, int]]],
+    master: np.ndarray,
+    master_sat: np.ndarray,
 ) -> tuple[int, int, int, int] | None:
     """Find a singles PNG in the master tileset.
 
-    Uses any non-empty 16x16 cell as anchor for hash lookup,
-    then does pixel-perfect verification of the full sprite.
+    Uses the non-empty 16x16 cells with the fewest master candidates as
+    anchors for hash lookup, rejects candidates whose total alpha differs
+    (O(1) via the master's summed-area table), then does pixel-perfect
+    verification of the full sprite.
     """
-    sw, sh = single.size
-    tile_cols = (sw + TILE - 1) // TILE
-    tile_rows = (sh + TILE - 1) // TILE
-
-    # Try each non-empty 16x16 cell in the single as an anchor
-    for tr in range(tile_rows):
-        for tc in range(tile_cols):
-            sx, sy = tc * TILE, tr * TILE
-            if sx + TILE > sw or sy + TILE > sh:
+    sh, sw = single.shape[:2]
+    alpha = single[..., 3]
+    alpha_sum = int(alpha.sum(dtype=np.int64))
+    mh, mw = master.shape[:2]
+
+    # Every full, non-empty 16x16 cell is a potential anchor; hash them in one
+    # batch. Fully opaque singles (common for terrain) skip the emptiness
+    # checks and normalization, which are no-ops for them.
+    opaque = bool(alpha.min() == 255)
+    cells = [
+        (tc * TILE, tr * TILE)
+        for tr in range(sh // TILE)
+        for tc in range(sw // TILE)
+        if opaque or not is_empty_tile(alpha, tc * TILE, tr * TILE)
+    ]
+    if not cells:
+        return None
+    tiles = np.stack([single[sy:sy + TILE, sx:sx + TILE] for sx, sy in cells])
+    if not opaque:
+        normalize_tiles(tiles)
+
+    # Keep the anchors that have master candidates
+    anchors = []
+    for (sx, sy), cell_hash in zip(cells, hash_tiles(tiles).tolist()):
+        candidates = master_index.get(cell_hash)
+        if candidates:
+            anchors.append((sx, sy, candidates))
+
+    # Rarest hash first keeps the number of verifications per single minimal
+    anchors.sort(key=lambda anchor: len(anchor[2]))
+    for sx, sy, candidates in anchors[:MAX_ANCHORS]:
+        for cx, cy in candidates:
+            # Infer top-left of the full sprite in master
+            mx = cx - sx
+            my = cy - sy
+            if mx < 0 or my < 0 or mx + sw > mw or my + sh > mh:
                 continue
-            if is_empty_tile(single, sx, sy):
+            region_sum = (master_sat[my + sh, mx + sw] - master_sat[my, mx + sw]
+                          - master_sat[my + sh, mx] + master_sat[my, mx])
+            if region_sum != alpha_sum:
                 continue
+            # Pixel-perfect verification of entire sprite
+            if pixels_match(single, master, mx, my, opaque):
+                return (mx, my, sw, sh)
+
+    return None
 
-            cell_hash = hash_tile(single, sx, sy)
-            candidates = master_index.get(cell_hash, [])
 
-            for cx, cy in candidates:
-                # Infer top-left of the full sprite in master
-                mx = cx - sx
-                my = cy - sy
-                if mx < 0 or my < 0:
-                    continue
-                # Pixel-perfect verification of entire sprite
-                if pixels_match(single, master, mx, my):
-                    return (mx, my, sw, sh)
+def file_digest(path: Path) -> bytes:
+    """Digest of a file's raw bytes, used to group byte-identical singles."""
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).digest()
 
-            # If we found candidates but none verified, try next anchor
-            # If no candidates at all, also try next anchor
 
-    return None
+# (name, shape, dtype) needed to attach to an array in shared memory
+SharedArraySpec = tuple[str, tuple[int, ...], str]
+
+
+def share_array(arr: np.ndarray) -> tuple[shared_memory.SharedMemory, SharedArraySpec]:
+    """Copy an array into a new shared memory block for pool workers to attach."""
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def attach_array(spec: SharedArraySpec) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Zero-copy view of an array created by share_array."""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+# Master state for search_single, set once per worker by _init_worker. The
+# shared memory handles are kept so the attached views stay valid.
+_search_state: tuple[dict[int, list[tuple[int, int]]], np.ndarray, np.ndarray] | None = None
+_shared_blocks: list[shared_memory.SharedMemory] = []
+
+
+def _init_worker(
+    master_index: dict[int, list[tuple[int, int]]],
+    master_spec: SharedArraySpec,
+    master_sat_spec: SharedArraySpec,
+) -> None:
+    global _search_state
+    master_shm, master = attach_array(master_spec)
+    sat_shm, master_sat = attach_array(master_sat_spec)
+    _shared_blocks.extend((master_shm, sat_shm))
+    _search_state = (master_index, master, master_sat)
+
+
+def search_single(path: Path) -> tuple[tuple[int, int, int, int] | None, tuple[int, int]]:
+    """Pool task: locate one singles PNG. Returns (location or None, single size)."""
+    single = np.asarray(as_rgba(Image.open(path)))
+    sh, sw = single.shape[:2]
+    return find_single_in_master(single, *_search_state), (sw, sh)
 
 
 def main():
     print(f"Loading master tileset: {MASTER}")
-    master = Image.open(MASTER).convert("RGBA")
+    master = as_rgba(Image.open(MASTER))
     print(f"Master size: {master.size[0]}x{master.size[1]}")
+    master_pixels = np.asarray(master)
+    master_sat = alpha_integral(master_pixels)
 
     print("\nBuilding master cell hash index...")
-    master_index = build_master_index(master)
+    master_index = build_master_index(master_pixels)
 
-    # Collect singles
+    # Collect singles, grouping byte-identical PNGs (the same prop is often
+    # filed under several themes) so each distinct file is searched once
     singles = sorted(SINGLES_DIR.rglob("*.png"))
-    print(f"\nFound {len(singles)} singles PNGs")
+    groups: dict[bytes, list[Path]] = {}
+    with ThreadPoolExecutor(max_workers=IO_THREADS) as io_pool:
+        for path, key in zip(singles, io_pool.map(file_digest, singles)):
+            groups.setdefault(key, []).append(path)
+    print(f"\nFound {len(singles)} singles PNGs ({len(groups)} unique)")
+
+    # Each group is searched independently; map() keeps results in input order.
+    # The master and its alpha table live in shared memory so every worker
+    # reads one copy instead of receiving its own.
+    found: dict[Path, tuple[tuple[int, int, int, int] | None, tuple[int, int]]] = {}
+    master_shm, master_spec = share_array(master_pixels)
+    sat_shm, master_sat_spec = share_array(master_sat)
+    try:
+        with ProcessPoolExecutor(
+            initializer=_init_worker,
+            initargs=(master_index, master_spec, master_sat_spec),
+        ) as pool:
+            results = pool.map(search_single, [paths[0] for paths in groups.values()], chunksize=32)
+            for i, (paths, result) in enumerate(zip(groups.values(), results)):
+                if (i + 1) % 500 == 0:
+                    print(f"  Progress: {i + 1}/{len(groups)} unique searched")
+                for path in paths:
+                    found[path] = result
+    finally:
+        for shm in (master_shm, sat_shm):
+            shm.close()
+            shm.unlink()
 
     # themes dict: theme -> { name: [x, y, w, h], ... }
     themes: dict[str, dict[str, list[int]]] = {}
@@ -149,14 +280,9 @@ def main():
     unmatched = 0
     unmatched_names = []
 
-    for i, path in enumerate(singles):
-        if (i + 1) % 500 == 0:
-            print(f"  Progress: {i + 1}/{len(singles)} ({matched} matched, {unmatched} unmatched)")
-
+    for path in singles:
+        loc, size = found[path]
         name = path.stem
-        single = Image.open(path).convert("RGBA")
-
-        loc = find_single_in_master(single, master_index, master)
         if loc:
             x, y, w, h = loc
             # Derive theme and prop name from filename
@@ -169,7 +295,7 @@ def main():
         else:
             unmatched += 1
             if len(unmatched_names) < 20:
-                unmatched_names.append(f"  {name} ({single.size[0]}x{single.size[1]})")
+                unmatched_names.append(f"  {name} ({size[0]}x{size[1]})")
 
     print(f"\nResults: {matched} matched, {unmatched} unmatched")
     if unmatched_names:
@@ -177,14 +303,11 @@ def main():
         for n in unmatched_names:
             print(n)
 
-    # Sort themes and sprite names for deterministic output
-    sorted_themes = {}
-    for theme in sorted(themes.keys()):
-        sorted_themes[theme] = dict(sorted(themes[theme].items()))
-
+    # sort_keys orders themes and sprite names in the C encoder for
+    # deterministic output, with no Python-side re-sort of the dicts
     OUT.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUT, "w") as f:
-        json.dump(
+    OUT.write_text(
+        json.dumps(
             {
                 "atlas": "Modern_Exteriors_Complete_Tileset.png",
                 "tileSize": TILE,
@@ -192,11 +315,12 @@ def main():
                 "atlasHeight": master.size[1],
                 "matched": matched,
                 "unmatched": unmatched,
-                "themes": sorted_themes,
+                "themes": themes,
             },
-            f,
             separators=(",", ":"),
+            sort_keys=True,
         )
+    )
     print(f"\nWrote {OUT} ({OUT.stat().st_size / 1024:.1f} KB)")
 
 
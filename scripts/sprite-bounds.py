@@ -20,44 +20,37 @@ def main():
 
     img = Image.open(png_path).convert("RGBA")
     width, height = img.size
-    pixels = img.load()
     cols = width // cell_w
     rows = height // cell_h
 
     print(f"Image: {width}x{height}, cell: {cell_w}x{cell_h}, grid: {cols}x{rows}\n")
 
+    # getbbox() on the alpha band scans each cell in C for non-zero pixels
+    alpha = img.getchannel("A")
+
     g_min_x, g_min_y = cell_w, cell_h
     g_max_x, g_max_y = -1, -1
 
     for row in range(rows):
         for col in range(cols):
-            min_x, min_y = cell_w, cell_h
-            max_x, max_y = -1, -1
-
-            for ly in range(cell_h):
-                for lx in range(cell_w):
-                    px = col * cell_w + lx
-                    py = row * cell_h + ly
-                    a = pixels[px, py][3]
-                    if a > 0:
-                        min_x = min(min_x, lx)
-                        max_x = max(max_x, lx)
-                        min_y = min(min_y, ly)
-                        max_y = max(max_y, ly)
-
-            if max_x >= 0:
-                w = max_x - min_x + 1
-                h = max_y - min_y + 1
-                blank_top = min_y
-                blank_bottom = cell_h - 1 - max_y
-                print(f"  [{row},{col}] bounds: x={min_x}..{max_x} y={min_y}..{max_y}  "
-                      f"size={w}x{h}  blankTop={blank_top} blankBottom={blank_bottom}")
-                g_min_x = min(g_min_x, min_x)
-                g_min_y = min(g_min_y, min_y)
-                g_max_x = max(g_max_x, max_x)
-                g_max_y = max(g_max_y, max_y)
-            else:
+            x0, y0 = col * cell_w, row * cell_h
+            bbox = alpha.crop((x0, y0, x0 + cell_w, y0 + cell_h)).getbbox()
+            if bbox is None:
                 print(f"  [{row},{col}] (empty)")
+                continue
+
+            min_x, min_y, right, bottom = bbox
+            max_x, max_y = right - 1, bottom - 1
+            w = max_x - min_x + 1
+            h = max_y - min_y + 1
+            blank_top = min_y
+            blank_bottom = cell_h - 1 - max_y
+            print(f"  [{row},{col}] bounds: x={min_x}..{max_x} y={min_y}..{max_y}  "
+                  f"size={w}x{h}  blankTop={blank_top} blankBottom={blank_bottom}")
+            g_min_x = min(g_min_x, min_x)
+            g_min_y = min(g_min_y, min_y)
+            g_max_x = max(g_max_x, max_x)
+            g_max_y = max(g_max_y, max_y)
 
     if g_max_x < 0:
         print("\nNo non-transparent pixels found!")
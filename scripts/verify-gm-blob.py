@@ -23,6 +23,10 @@ Quadrant relationships:
   SE quadrant → affected by S, E, SE neighbors
 """
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import numpy as np
 from PIL import Image
 import sys
 
@@ -31,100 +35,120 @@ HALF = 8
 COLS = 12
 ROWS = 4
 
-
-def analyze_sheet(path):
+# Regions sampled in each cell, as (slice_y, slice_x):
+# - NW/NE/SW/SE quadrants: 8x8
+# - N/W/E/S edges: outer 3px, middle 10px (avoid corners)
+# - NW/NE/SW/SE corners: 4x4
+# Edges and corners are finer-grained, used to separate cardinal from
+# diagonal effects.
+REGIONS = [
+    # Quadrants
+    (slice(0, HALF), slice(0, HALF)), (slice(0, HALF), slice(HALF, TILE)),
+    (slice(HALF, TILE), slice(0, HALF)), (slice(HALF, TILE), slice(HALF, TILE)),
+    # Cardinal edges
+    (slice(0, 3), slice(3, 13)), (slice(3, 13), slice(0, 3)),
+    (slice(3, 13), slice(13, 16)), (slice(13, 16), slice(3, 13)),
+    # Corners
+    (slice(0, 4), slice(0, 4)), (slice(0, 4), slice(12, 16)),
+    (slice(12, 16), slice(0, 4)), (slice(12, 16), slice(12, 16)),
+]
+
+
+def region_mask(sy, sx):
+    """Flattened 0/1 pixel mask of one region of a cell."""
+    mask = np.zeros((TILE, TILE), dtype=np.float32)
+    mask[sy, sx] = 1
+    return mask.ravel()
+
+
+# One row per region
+REGION_PX = np.stack([region_mask(sy, sx) for sy, sx in REGIONS])
+REGION_AREA = REGION_PX.sum(axis=1)
+
+# The 47 canonical blob masks
+EXPECTED_47 = frozenset((
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    19, 23, 27, 31, 37, 39, 45, 47, 55, 63, 74, 75, 78, 79, 91,
+    95, 111, 127, 140, 141, 142, 143, 159, 173, 175, 191, 206,
+    207, 223, 239, 255,
+))
+
+# Bitmask weights for N, W, E, S and NW, NE, SW, SE
+CARDINAL_BITS = np.array([1, 2, 4, 8])
+DIAGONAL_BITS = np.array([16, 32, 64, 128])
+
+
+def load_sheet(path):
+    """Sheet pixels as an (H, W, 4) uint8 array."""
     img = Image.open(path).convert("RGBA")
-    pixels = img.load()
-    w, h = img.size
-
-    # Extract all pixels for a cell as a flat list of (r,g,b,a)
-    def get_cell(col, row):
-        x0, y0 = col * TILE, row * TILE
-        result = []
-        for dy in range(TILE):
-            for dx in range(TILE):
-                result.append(pixels[x0 + dx, y0 + dy])
-        return result
-
-    # Find transparent cell
-    unused = None
-    for row in range(ROWS):
-        for col in range(COLS):
-            cell = get_cell(col, row)
-            if all(p[3] < 128 for p in cell):
-                unused = (col, row)
+    return np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(img.height, img.width, 4)
+
+
+def analyze_sheet(arr):
+    # Whole sheet as (ROWS, COLS, TILE, TILE, 4)
+    cells = arr[:ROWS * TILE, :COLS * TILE].reshape(ROWS, TILE, COLS, TILE, 4).transpose(0, 2, 1, 3, 4)
+
+    # Find transparent cell (the last one in row-major order if several)
+    clear = cells[..., 3] < 128
+    transparent = clear.all(axis=(2, 3))
+    unused_rc = np.argwhere(transparent)
+    unused = (int(unused_rc[-1][1]), int(unused_rc[-1][0])) if len(unused_rc) else None
     print(f"Unused cell: {unused}")
 
-    # Reference: mask 255 = solid fill at (1, 0)
-    ref_cell = get_cell(1, 0)
-    ref_rgb = [(p[0], p[1], p[2]) for p in ref_cell]
-
-    def pixel_diff(p1, p2):
-        """Squared color distance between two RGB tuples."""
-        return sum((p1[i] - p2[i]) ** 2 for i in range(3))
-
-    def quadrant_diff(cell_pixels, qx, qy):
-        """
-        Compute average pixel difference from reference in a quadrant.
-        qx, qy: quadrant offsets (0 or 8) within the 16x16 tile.
-        """
-        total = 0.0
-        count = 0
-        for dy in range(HALF):
-            for dx in range(HALF):
-                idx = (qy + dy) * TILE + (qx + dx)
-                r, g, b, a = cell_pixels[idx]
-                if a < 128:
-                    # Transparent pixel = definitely different from primary
-                    total += 10000
-                    count += 1
-                    continue
-                total += pixel_diff((r, g, b), ref_rgb[idx])
-                count += 1
-        return total / count if count > 0 else 0
-
-    # For each cell, compute the 4 quadrant differences
-    results = []
-    all_qdiffs = []  # for threshold analysis
-
-    for row in range(ROWS):
-        for col in range(COLS):
-            cell = get_cell(col, row)
-            if all(p[3] < 128 for p in cell):
-                results.append({"col": col, "row": row, "mask": -1, "qdiffs": (0, 0, 0, 0)})
-                continue
-
-            nw_diff = quadrant_diff(cell, 0, 0)
-            ne_diff = quadrant_diff(cell, HALF, 0)
-            sw_diff = quadrant_diff(cell, 0, HALF)
-            se_diff = quadrant_diff(cell, HALF, HALF)
-
-            results.append({
-                "col": col, "row": row,
-                "qdiffs": (nw_diff, ne_diff, sw_diff, se_diff),
-                "mask": None
-            })
-            all_qdiffs.extend([nw_diff, ne_diff, sw_diff, se_diff])
+    # Reference: mask 255 = solid fill at (1, 0), as a (TILE, TILE, 3) tile in
+    # the same dtype as the diff so it broadcasts against every cell unconverted
+    ref_rgb = arr[0:TILE, TILE:2 * TILE, :3].astype(np.int32)
+
+    # Every pixel's squared RGB distance from the reference, computed once
+    # for all cells. At most 3 * 255**2 per pixel, and at most 64 pixels per
+    # region, so sums stay exact integers in float32
+    d = cells[..., :3].astype(np.int32) - ref_rgb
+    dr, dg, db = d[..., 0], d[..., 1], d[..., 2]
+    diff = (dr * dr + dg * dg + db * db).astype(np.float32)
+    # Transparent pixel = definitely different from primary; skipped for
+    # sheets with no transparent pixels at all
+    if clear.any():
+        diff = np.where(clear, np.float32(10000), diff)
+
+    # Every region mean in one pass: flattened cell diffs times the stacked
+    # region masks gives all region sums per cell at once. Transparent cells
+    # are already classified as unused, so only the others are sampled
+    means = np.zeros((ROWS, COLS, len(REGIONS)), dtype=np.float32)
+    means[~transparent] = (diff[~transparent].reshape(-1, TILE * TILE) @ REGION_PX.T) / REGION_AREA
+    # Struct-of-arrays per cell, indexed by row * COLS + col
+    used = ~transparent.ravel()
+    means = means.reshape(ROWS * COLS, len(REGIONS))
+    qdiffs, edges, corners = means[:, 0:4], means[:, 4:8], means[:, 8:12]
+
+    # Diffs of the used cells, for threshold analysis
+    all_qdiffs = qdiffs[used].ravel()
+    # Edge and corner diffs gathered separately to find thresholds
+    all_edge_diffs = edges[used].ravel()
+    all_corner_diffs = corners[used].ravel()
+
+    def widest_gap(diffs):
+        """Sort diffs and return (sorted, index just above the widest gap), 0 if all equal."""
+        diffs = np.asarray(diffs, dtype=np.float64)
+        # No gap to find if every diff is equal (e.g. a sheet whose corners
+        # never differ from the fill), so skip the sort
+        if len(diffs) < 2 or diffs.min() == diffs.max():
+            return diffs, 0
+        sorted_d = np.sort(diffs)
+        gaps = np.diff(sorted_d)
+        i = int(gaps.argmax())
+        return sorted_d, i + 1 if gaps[i] > 0 else 0
 
     # Find threshold: quadrants that are "same as primary" vs "different"
     # The distribution should be bimodal: near-zero for matching quadrants,
     # large for non-matching.
-    sorted_diffs = sorted(d for d in all_qdiffs if d > 0)
-    if sorted_diffs:
-        # Find the gap in the distribution
-        max_gap = 0
-        gap_idx = 0
-        for i in range(1, len(sorted_diffs)):
-            gap = sorted_diffs[i] - sorted_diffs[i-1]
-            if gap > max_gap:
-                max_gap = gap
-                gap_idx = i
+    sorted_diffs, gap_idx = widest_gap(all_qdiffs[all_qdiffs > 0])
+    if len(sorted_diffs):
         threshold = (sorted_diffs[gap_idx-1] + sorted_diffs[gap_idx]) / 2 if gap_idx > 0 else sorted_diffs[0] / 2
     else:
         threshold = 100
 
     print(f"Auto threshold: {threshold:.1f}")
-    print(f"  Diffs range: {min(sorted_diffs):.1f} to {max(sorted_diffs):.1f}")
+    print(f"  Diffs range: {sorted_diffs[0]:.1f} to {sorted_diffs[-1]:.1f}")
     print(f"  Gap at: below={sorted_diffs[gap_idx-1]:.1f}, above={sorted_diffs[gap_idx]:.1f}")
 
     # Now classify using quadrant logic.
@@ -146,143 +170,44 @@ def analyze_sheet(path):
     # Actually, let's try a different approach: use sub-quadrant sampling.
     # Split each 8x8 quadrant into its edge region (outer 3px) vs inner region.
 
-    def sub_region_diff(cell_pixels, x_start, y_start, x_size, y_size):
-        """Diff from reference for a sub-region."""
-        total = 0.0
-        count = 0
-        for dy in range(y_size):
-            for dx in range(x_size):
-                px = x_start + dx
-                py = y_start + dy
-                idx = py * TILE + px
-                r, g, b, a = cell_pixels[idx]
-                if a < 128:
-                    total += 10000
-                    count += 1
-                    continue
-                total += pixel_diff((r, g, b), ref_rgb[idx])
-                count += 1
-        return total / count if count > 0 else 0
-
-    # Re-analyze with finer-grained regions
-    # For each cell, check 8 regions:
-    # - N edge: top 3 rows, middle 10 columns (avoid corners)
-    # - S edge: bottom 3 rows, middle 10 columns
-    # - W edge: left 3 cols, middle 10 rows
-    # - E edge: right 3 cols, middle 10 rows
-    # - NW corner: top-left 4x4
-    # - NE corner: top-right 4x4
-    # - SW corner: bottom-left 4x4
-    # - SE corner: bottom-right 4x4
-
-    for entry in results:
-        if entry["mask"] == -1:
-            continue
-        col, row = entry["col"], entry["row"]
-        cell = get_cell(col, row)
-
-        # Cardinal edges (middle section, avoiding corners)
-        n_diff = sub_region_diff(cell, 3, 0, 10, 3)
-        s_diff = sub_region_diff(cell, 3, 13, 10, 3)
-        w_diff = sub_region_diff(cell, 0, 3, 3, 10)
-        e_diff = sub_region_diff(cell, 13, 3, 3, 10)
-
-        # Corner 4x4 regions
-        nw_diff = sub_region_diff(cell, 0, 0, 4, 4)
-        ne_diff = sub_region_diff(cell, 12, 0, 4, 4)
-        sw_diff = sub_region_diff(cell, 0, 12, 4, 4)
-        se_diff = sub_region_diff(cell, 12, 12, 4, 4)
-
-        entry["edges"] = (n_diff, w_diff, e_diff, s_diff)
-        entry["corners"] = (nw_diff, ne_diff, sw_diff, se_diff)
-
-    # Gather all edge diffs and corner diffs separately to find thresholds
-    all_edge_diffs = []
-    all_corner_diffs = []
-    for entry in results:
-        if entry["mask"] == -1 or "edges" not in entry:
-            continue
-        all_edge_diffs.extend(entry["edges"])
-        all_corner_diffs.extend(entry["corners"])
-
     def find_threshold(diffs, label):
-        sorted_d = sorted(diffs)
-        max_gap = 0
-        gap_idx = 0
-        for i in range(1, len(sorted_d)):
-            gap = sorted_d[i] - sorted_d[i-1]
-            if gap > max_gap:
-                max_gap = gap
-                gap_idx = i
+        sorted_d, gap_idx = widest_gap(diffs)
         if gap_idx > 0:
             thresh = (sorted_d[gap_idx-1] + sorted_d[gap_idx]) / 2
         else:
-            thresh = sorted_d[-1] / 2 if sorted_d else 100
+            thresh = sorted_d[-1] / 2 if len(sorted_d) else 100
         print(f"  {label} threshold: {thresh:.1f} (gap: {sorted_d[gap_idx-1]:.1f} | {sorted_d[gap_idx]:.1f})")
         return thresh
 
     edge_thresh = find_threshold(all_edge_diffs, "Edge")
     corner_thresh = find_threshold(all_corner_diffs, "Corner")
 
-    # Classify each cell
-    for entry in results:
-        if entry["mask"] == -1 or "edges" not in entry:
-            continue
-        n_diff, w_diff, e_diff, s_diff = entry["edges"]
-        nw_diff, ne_diff, sw_diff, se_diff = entry["corners"]
-
-        # Cardinal: edge is primary (neighbor present) if diff is small
-        n = n_diff < edge_thresh
-        w = w_diff < edge_thresh
-        e = e_diff < edge_thresh
-        s = s_diff < edge_thresh
-
-        mask = 0
-        if n: mask |= 1
-        if w: mask |= 2
-        if e: mask |= 4
-        if s: mask |= 8
-        # Diagonal: corner is primary only if both adjacent cardinals are present
-        if n and w and nw_diff < corner_thresh: mask |= 16
-        if n and e and ne_diff < corner_thresh: mask |= 32
-        if s and w and sw_diff < corner_thresh: mask |= 64
-        if s and e and se_diff < corner_thresh: mask |= 128
-
-        entry["mask"] = mask
+    # Classify each cell; unused cells stay -1
+    mask = np.full(ROWS * COLS, -1, dtype=np.int16)
+    # Cardinal N, W, E, S: edge is primary (neighbor present) if diff is small
+    cardinal = edges[used] < edge_thresh
+    n, w, e, s = cardinal.T
+    # Diagonal NW, NE, SW, SE: corner is primary only if both adjacent cardinals are present
+    diagonal = np.stack([n & w, n & e, s & w, s & e], axis=1) & (corners[used] < corner_thresh)
+    mask[used] = cardinal @ CARDINAL_BITS | diagonal @ DIAGONAL_BITS
 
     # Print grid
-    print(f"\nReconstructed bitmask grid:")
-    print(f"{'':>7}", end="")
-    for c in range(COLS):
-        print(f" col{c:2d}", end="")
-    print()
+    lines = ["", "Reconstructed bitmask grid:", f"{'':>7}" + "".join(f" col{c:2d}" for c in range(COLS))]
     for r in range(ROWS):
-        print(f"row {r}: ", end="")
-        for c in range(COLS):
-            entry = results[r * COLS + c]
-            m = entry["mask"]
-            if m < 0:
-                print(f"   -- ", end="")
-            else:
-                print(f"  {m:3d} ", end="")
-        print()
+        row_masks = mask[r * COLS:(r + 1) * COLS]
+        lines.append(f"row {r}: " + "".join("   -- " if m < 0 else f"  {m:3d} " for m in row_masks))
+    sys.stdout.write("\n".join(lines) + "\n")
 
     # Validate
-    from collections import Counter
-    masks = [r["mask"] for r in results if r["mask"] >= 0]
-    mask_counts = Counter(masks)
-    expected_47 = {0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
-                   19, 23, 27, 31, 37, 39, 45, 47, 55, 63, 74, 75, 78, 79, 91,
-                   95, 111, 127, 140, 141, 142, 143, 159, 173, 175, 191, 206,
-                   207, 223, 239, 255}
-
-    present = set(masks)
-    missing = expected_47 - present
-    extra = present - expected_47
-    duplicated = {m: c for m, c in mask_counts.items() if c > 1 and m >= 0}
+    masks = mask[mask >= 0]
+    mask_counts = np.bincount(masks, minlength=256)
+    present = set(np.flatnonzero(mask_counts).tolist())
+    missing = EXPECTED_47 - present
+    extra = present - EXPECTED_47
+    duplicated = {int(m): int(mask_counts[m]) for m in np.flatnonzero(mask_counts > 1)}
 
     print(f"\nValidation:")
-    print(f"  Unique masks: {len(set(masks))} (expected 47)")
+    print(f"  Unique masks: {len(present)} (expected 47)")
     if missing:
         print(f"  Missing: {sorted(missing)}")
     if extra:
@@ -295,15 +220,31 @@ def analyze_sheet(path):
     # Output mapping
     if not missing and not extra and not duplicated:
         print(f"\nCorrect mapping [mask, col, row]:")
-        for entry in sorted(results, key=lambda e: e["mask"]):
-            if entry["mask"] >= 0:
-                print(f"  [{entry['mask']:3d}, {entry['col']:2d}, {entry['row']}],")
+        for i in np.argsort(mask, kind="stable"):
+            if mask[i] >= 0:
+                print(f"  [{mask[i]:3d}, {i % COLS:2d}, {i // COLS}],")
+
+    return mask
 
-    return results
+
+def report_sheet(path):
+    """Load and analyze one sheet, returning the printed report."""
+    out = io.StringIO()
+    with redirect_stdout(out):
+        analyze_sheet(load_sheet(path))
+    return out.getvalue()
 
 
 if __name__ == "__main__":
     sheets = sys.argv[1:] or ["public/assets/tilesets/me-autotile-01.png"]
-    for s in sheets:
-        print(f"\n{'=' * 60}")
-        analyze_sheet(s)
+    if len(sheets) > 1:
+        # Sheets are independent: analyze them in parallel, capturing each
+        # report so output stays in argument order
+        with ProcessPoolExecutor() as pool:
+            for report in pool.map(report_sheet, sheets):
+                print(f"\n{'=' * 60}")
+                sys.stdout.write(report)
+    else:
+        for s in sheets:
+            print(f"\n{'=' * 60}")
+            analyze_sheet(load_sheet(s))